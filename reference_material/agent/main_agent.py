@@ -12,7 +12,7 @@ from typing import Dict, List
 from PIL import Image
 
 from src.agent.prompts import build_thinking_prompt, build_action_prompt
-from src.agent.memory.memory_manager import MemoryManager
+from src.agent.memory.memory_manager import MemoryManager, json_default
 from src.agent.model_manager import ModelManager
 from src.agent.toolset import Toolset
 from src.vision.resnet_vision_tool import ResNetVisionTool
@@ -160,7 +160,6 @@ class MainAgent:
                 self.current_mode,
                 self.emulator,
                 text_state,
-                short_ctx,
                 mid_ctx,
                 goals_txt,
                 self.memory_mgr.data.get("knowledge_base", {}),
@@ -177,17 +176,7 @@ class MainAgent:
             internal_thoughts = tagged_thoughts
 
             # ---------------- ACTION PHASE ------------------------------------
-            act_prompt = build_action_prompt(
-                self.current_mode,
-                text_state,
-                short_ctx,
-                mid_ctx,
-                goals_txt,
-                internal_thoughts,
-                self.memory_mgr.data.get("knowledge_base", {}),
-                recent_thoughts,
-                recent_actions
-            )
+            act_prompt = build_action_prompt(self.current_mode, internal_thoughts)
             
             # llm_intended_tool_calls is the list of calls from ModelManager
             llm_calls, act_req, act_raw = self.model_mgr.call_action_selector(
@@ -361,7 +350,7 @@ class MainAgent:
                             )
                     except Exception as e:
                         self.logger.error(
-                            f"Error parsing perception block: {e} | block={json.dumps(block)[:500]}"
+                            f"Error parsing perception block: {e} | block={json.dumps(block, default=json_default)[:500]}"
                         )
 
                 # ---- full memory snapshot -----------------------------------
@@ -389,7 +378,7 @@ class MainAgent:
                     "src", "logs", "iterations", f"iteration_{self.iteration_count:03}.json"
                 )
                 with open(log_path, "w", encoding="utf-8") as fp:
-                    json.dump(iter_data, fp, indent=2)
+                    json.dump(iter_data, fp, indent=2, default=json_default)
 
             except Exception as err:
                 self.logger.error(f"[ITER LOG] failed to build/write: {err}")
@@ -1,5 +1,39 @@
 import json, logging, os, time, requests
-from typing import List
+from typing import Any, List, NamedTuple
+
+
+def json_default(obj):
+    """
+    `default=` hook for json.dump: base64 screenshot payloads are kept as
+    bytes in memory and only decoded here, when they are written out.
+    """
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class RecentAction(NamedTuple):
+    """
+    The slice of an executed tool call that the prompts need. Full log
+    entries carry perception blocks and raw responses; only this projection
+    is kept in action_history.
+    """
+    name: str
+    args: Any
+    err_reason: str | None  # None unless the call errored
+    ga: str | None          # perception general_analysis, if any
+
+    @classmethod
+    def from_entry(cls, entry) -> "RecentAction":
+        """Project a MainAgent log entry (or a stored JSON list) to a RecentAction."""
+        if not isinstance(entry, dict):
+            return cls(*entry)
+        err_reason = None
+        if entry.get("status") == "error" and entry.get("error_details"):
+            err_reason = entry["error_details"].get("reason", "")
+        pb = entry.get("perception_block")
+        ga = pb.get("general_analysis") if isinstance(pb, dict) else None
+        return cls(entry["name"], entry["arguments"], err_reason, ga or None)
+
 
 class MemoryManager:
     """
@@ -48,15 +82,35 @@ class MemoryManager:
                 for k in self.data:
                     if k not in disk:
                         disk[k] = self.data[k]
+                disk["action_history"] = self._load_action_history(disk["action_history"])
                 self.data = disk
                 self.log.info("[Memory] loaded %s", self.file_path)
             except Exception as e:
                 self.log.warning("[Memory] failed to load (%s) – fresh start", e)
 
+    def _load_action_history(self, raw) -> list[list[RecentAction]]:
+        """Project stored history entry by entry; malformed entries are skipped, not fatal."""
+        history, skipped = [], 0
+        for it in raw if isinstance(raw, list) else []:
+            if not isinstance(it, list):
+                # An empty placeholder would shift every older "Iter -n" label
+                skipped += 1
+                continue
+            actions = []
+            for a in it:
+                try:
+                    actions.append(RecentAction.from_entry(a))
+                except Exception:
+                    skipped += 1
+            history.append(actions)
+        if skipped:
+            self.log.warning("[Memory] skipped %d malformed action_history entries", skipped)
+        return history
+
     def _save(self):
         try:
             with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2)
+                json.dump(self.data, f, indent=2, default=json_default)
         except Exception as e:
             self.log.error("[Memory] save-error: %s", e)
 
@@ -199,9 +253,10 @@ class MemoryManager:
     def add_action_history(self, actions: List[dict], window_size: int | None = None):
         """
         Append a list describing all tool-calls of one iteration.
-        Each item should already be JSON-serialisable.
+        Each log entry is stored as its RecentAction projection.
         """
         if not actions: return
+        actions = [RecentAction.from_entry(a) for a in actions]
         if window_size is None:
             window_size = int(os.getenv("ACTION_WINDOW", 30))
         buf = self.data["action_history"]
@@ -210,6 +265,6 @@ class MemoryManager:
             self.data["action_history"] = buf[-window_size:]
         self._save()
 
-    def get_action_history(self, last_n: int | None = None) -> List[List[dict]]:
+    def get_action_history(self, last_n: int | None = None) -> List[List[RecentAction]]:
         buf = self.data.get("action_history", [])
         return buf if last_n is None else buf[-last_n:]
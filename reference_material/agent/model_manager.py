@@ -36,6 +36,7 @@ class ModelManager:
             "messages":    prompt_dict["messages"],
             "max_completion_tokens":  4000,
         }
+        self._add_cache_key(payload, prompt_dict)
         raw = self._post(payload)
         text = raw["choices"][0]["message"]["content"].strip()
         return text, payload, raw
@@ -54,6 +55,7 @@ class ModelManager:
             "temperature":  0.1,
             "max_tokens":   1000
         }
+        self._add_cache_key(payload, prompt_dict)
         raw = self._post(payload)
 
         calls = []
@@ -68,6 +70,14 @@ class ModelManager:
                     })
         return calls, payload, raw
 
+    # The system prompts are large and static; tagging requests that share one
+    # routes them to the same server-side prefix cache.
+    @staticmethod
+    def _add_cache_key(payload: dict, prompt_dict: dict):
+        cache_key = prompt_dict.get("prompt_cache_key")
+        if cache_key:
+            payload["prompt_cache_key"] = cache_key
+
     # low-level HTTP with retries
     def _post(self, payload: dict, tries: int = 3):
         for n in range(tries):
@@ -1,27 +1,120 @@
 # src/agent/perception/perception_agent.py
 
 import os
-import time
+import asyncio
 import glob
+import queue
+import threading
 import base64
-import json
-from typing import Tuple, List, Dict
+import io
+from typing import Any, Tuple, List, Dict
+try:
+    import orjson
+
+    orjson_available = True
+except ImportError:
+    import json
+
+    orjson_available = False
 from pydantic import BaseModel
+# Only convert()/thumbnail(BILINEAR) are used on the hot path, so a Pillow-SIMD
+# install (same `PIL` namespace) accelerates this module without code changes.
 from PIL import Image
 
 from google import genai
 from google.genai import types
 
+MOVE_DIRECTION = {
+    "UP": (0, -1),
+    "DOWN": (0, 1),
+    "LEFT": (-1, 0),
+    "RIGHT": (1, 0),
+    "UNKNOWN": (0, 0)
+}
+
 class PerceptionAgentOutput(BaseModel):
     general_analysis: str
     overworld_analysis: str
     game_state_flag: str
 
 class PerceptionAgent:
+    # 6 screenshots 0.4s apart, plus a final confirmation frame 1s later
+    POST_MOVE_SCREENSHOTS = 7
+    # Frames larger than this (e.g. full-window captures) are shrunk before upload
+    MAX_FRAME_SIZE = (768, 768)
+
     def __init__(self, gemini_api_key: str = None):
         if gemini_api_key is None:
             gemini_api_key = os.getenv("GEMINI_API_KEY", "MISSING_API_KEY")
         self.client = genai.Client(api_key=gemini_api_key)
+        # self.client.aio keeps a connection pool bound to the loop it first ran
+        # on, so every blocking call must reuse the same loop (asyncio.run would
+        # close it after each call and break the next request)
+        self._loop = None
+
+    @staticmethod
+    def _grab_screenshot(emulator, index: int) -> Tuple[str, bytes]:
+        """
+        Capture one perception frame as (filename, png_bytes).
+        Emulators exposing get_screenshot_perception_bytes() are read straight
+        from memory; otherwise the PNG written by get_screenshot_perception()
+        is read back once and reused for both decoding and base64.
+        """
+        grab_bytes = getattr(emulator, "get_screenshot_perception_bytes", None)
+        if grab_bytes is not None:
+            return f"perception_{index}.png", grab_bytes()
+        path = emulator.get_screenshot_perception()
+        with open(path, "rb") as f:
+            return path, f.read()
+
+    @classmethod
+    def _capture_post_move_screenshots(
+        cls, emulator, frame_queue: queue.Queue, stop: threading.Event
+    ) -> None:
+        """
+        Producer for analyze_images_and_reasoning: pushes each post-move
+        (filename, png_bytes) frame onto the queue. On failure, pushes the
+        exception instead so the consumer can re-raise it. Returns early
+        once `stop` is set, so the emulator is not touched after the
+        consumer has given up.
+        """
+        for i in range(6):
+            try:
+                frame_queue.put(cls._grab_screenshot(emulator, i + 1))
+            except Exception as e:
+                frame_queue.put(RuntimeError(f"Failed to capture post-move screenshot {i+1}: {e}"))
+                return
+            if stop.wait(0.4):
+                return
+
+        if stop.wait(1):
+            return
+        try:
+            frame_queue.put(cls._grab_screenshot(emulator, 7))
+        except Exception as e:
+            frame_queue.put(RuntimeError(f"Failed to capture final post-move screenshot: {e}"))
+
+    @classmethod
+    def _open_screenshot(cls, frame: Tuple[str, bytes]) -> Image.Image:
+        filename, png_bytes = frame
+        try:
+            img = Image.open(io.BytesIO(png_bytes))
+            # Let the decoder reduce resolution up front where the format allows it
+            img.draft("RGB", cls.MAX_FRAME_SIZE)
+            img = img.convert("RGB")
+            # Never upscales; native 240x160 GBA frames pass through untouched
+            img.thumbnail(cls.MAX_FRAME_SIZE, Image.Resampling.BILINEAR)
+            return img
+        except Exception as e:
+            raise RuntimeError(f"Failed to open screenshot image from {filename}: {e}")
+
+    @staticmethod
+    def _encode_screenshot(frame: Tuple[str, bytes]) -> Dict[str, Any]:
+        filename, png_bytes = frame
+        return {
+            "filename": filename,
+            "base64_data": base64.b64encode(png_bytes)
+        }
 
     def analyze_images_and_reasoning(
         self,
@@ -29,35 +122,52 @@ class PerceptionAgent:
         button: str,
         main_agent_move_reasoning: str,
         short_context: str
+    ) -> Tuple[str, str, str, List[Dict[str, Any]], Dict, str]:
+        """
+        Blocking entry point for the synchronous agent loop; see
+        analyze_images_and_reasoning_async for the actual pipeline.
+        Runs on one event loop kept for the agent's lifetime.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self.analyze_images_and_reasoning_async(
+            emulator=emulator,
+            button=button,
+            main_agent_move_reasoning=main_agent_move_reasoning,
+            short_context=short_context,
+        ))
+
+    async def analyze_images_and_reasoning_async(
+        self,
+        emulator,
+        button: str,
+        main_agent_move_reasoning: str,
+        short_context: str
     ) -> Tuple[
         str,                 # general_analysis
         str,                 # overworld_analysis
         str,                 # game_state_flag
-        List[Dict[str, str]],# screenshot_data
+        List[Dict[str, Any]],# screenshot_data
         Dict,                # request_payload
         str                  # raw_response as JSON string
     ]:
-        move_direction = {
-            "UP": (0, -1),
-            "DOWN": (0, 1),
-            "LEFT": (-1, 0),
-            "RIGHT": (1, 0),
-            "UNKNOWN": (0, 0)
-        }
         # 1) Capture screenshot BEFORE the move
-        screenshot_paths = []
+        frames = []
         try:
-            pre_move_ss = emulator.get_screenshot_perception()
-            screenshot_paths.append(pre_move_ss)
+            pre_move_ss = await asyncio.to_thread(self._grab_screenshot, emulator, 0)
+            frames.append(pre_move_ss)
         except Exception as e:
             raise RuntimeError(f"Failed to capture pre-move screenshot: {e}")
         
         # 2) Get player information before the move
-        if emulator.get_player_xy() and emulator.get_player_direction():
-            player_x, player_y = emulator.get_player_xy()
-            player_facing = emulator.get_player_direction()
-            facing_tile_x = player_x + move_direction[player_facing.upper()][0]
-            facing_tile_y = player_y + move_direction[player_facing.upper()][1]
+        xy = await asyncio.to_thread(emulator.get_player_xy)
+        facing = await asyncio.to_thread(emulator.get_player_direction)
+        if xy and facing:
+            player_x, player_y = xy
+            player_facing = facing
+            dx, dy = MOVE_DIRECTION.get(facing.upper(), (0, 0))
+            facing_tile_x = player_x + dx
+            facing_tile_y = player_y + dy
         else:
             player_x = "NA"
             player_y = "NA"
@@ -68,38 +178,51 @@ class PerceptionAgent:
 
         # 3) Press the button
         try:
-            emulator.press_button(button)
+            await asyncio.to_thread(emulator.press_button, button)
         except Exception as e:
             raise RuntimeError(f"Failed to press button {button}: {e}")
 
-        # 4) Capture 7 post-move screenshots, each after 0.5s
-        for i in range(6):
-            try:
-                post_move_ss = emulator.get_screenshot_perception()
-                screenshot_paths.append(post_move_ss)
-            except Exception as e:
-                raise RuntimeError(f"Failed to capture post-move screenshot {i+1}: {e}")
-            time.sleep(0.4)
+        # 4) Capture 7 post-move screenshots on a producer thread so that each
+        #    frame can be decoded while the next one is still being captured.
+        frame_queue = queue.Queue()
+        stop_capture = threading.Event()
+        producer = threading.Thread(
+            target=self._capture_post_move_screenshots,
+            args=(emulator, frame_queue, stop_capture),
+            daemon=True,
+        )
+        producer.start()
 
-        time.sleep(1)
+        # 4b) Decode each frame into a PIL image for the API call. Whatever
+        #     happens here, the producer is stopped and joined before we go on
+        #     using the emulator from this thread.
         try:
-            pre_move_ss = emulator.get_screenshot_perception()
-            screenshot_paths.append(pre_move_ss)
-        except Exception as e:
-            raise RuntimeError(f"Failed to capture pre-move screenshot: {e}")
-        
+            image_parts = [await asyncio.to_thread(self._open_screenshot, frames[0])]
+            for _ in range(self.POST_MOVE_SCREENSHOTS):
+                item = await asyncio.to_thread(frame_queue.get)
+                if isinstance(item, Exception):
+                    raise item
+                frames.append(item)
+                image_parts.append(await asyncio.to_thread(self._open_screenshot, item))
+        finally:
+            stop_capture.set()
+            await asyncio.to_thread(producer.join)
+
         # 5) Get player information after the move
-        if emulator.get_player_xy() and emulator.get_player_direction():
-            after_player_x, after_player_y = emulator.get_player_xy()
-            after_player_facing = emulator.get_player_direction()
-            after_facing_tile_x = after_player_x + move_direction[after_player_facing.upper()][0]
-            after_facing_tile_y = after_player_y + move_direction[after_player_facing.upper()][1]
+        xy = await asyncio.to_thread(emulator.get_player_xy)
+        facing = await asyncio.to_thread(emulator.get_player_direction)
+        if xy and facing:
+            after_player_x, after_player_y = xy
+            after_player_facing = facing
+            dx, dy = MOVE_DIRECTION.get(facing.upper(), (0, 0))
+            after_facing_tile_x = after_player_x + dx
+            after_facing_tile_y = after_player_y + dy
         else:
-            player_x = "NA"
-            player_y = "NA"
-            player_facing = "NA"
-            facing_tile_x = "NA"
-            facing_tile_y = "NA"
+            after_player_x = "NA"
+            after_player_y = "NA"
+            after_player_facing = "NA"
+            after_facing_tile_x = "NA"
+            after_facing_tile_y = "NA"
 
         # 5) Build system and user prompts (DO NOT CHANGE PROMPTS)
         system_msg = (
@@ -151,23 +274,13 @@ class PerceptionAgent:
 
         final_marker = "(END_OF_SERIES)"
 
-        # 6) Convert each screenshot path into a PIL image for the API call
-        image_parts = []
-        for path in screenshot_paths:
-            try:
-                pil_image = Image.open(path).convert("RGB")
-                image_parts.append(pil_image)
-            except Exception as e:
-                raise RuntimeError(f"Failed to open screenshot image from {path}: {e}")
-
         # 7) Construct the complete contents for the Gemini API call.
         complete_contents = [
             {"text": system_msg},
             {"text": user_msg + "\n\n" + schema_prompt},
+            *image_parts,
+            {"text": final_marker},
         ]
-        for img in image_parts:
-            complete_contents.append(img)
-        complete_contents.append({"text": final_marker})
 
         # 8) Prepare configuration and request payload details for logging
         request_payload = {
@@ -187,8 +300,13 @@ class PerceptionAgent:
         )
 
         # 9) Call Gemini API
-        chat = self.client.chats.create(model="gemini-2.0-flash")
-        final_response = chat.send_message(complete_contents, config=config)
+        # Each perception call is independent, so use the stateless endpoint
+        # instead of a chat session that would keep unused history around.
+        final_response = await self.client.aio.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=complete_contents,
+            config=config,
+        )
         if not final_response.parsed:
             raise ValueError("Gemini did not return valid structured JSON.")
 
@@ -196,32 +314,29 @@ class PerceptionAgent:
         if not isinstance(output_obj, PerceptionAgentOutput):
             raise ValueError("Parsed object is not of type PerceptionAgentOutput.")
 
-        # 10) Instead of using MessageToDict (which expects a protobuf), we use the pydantic .dict() method.
-        raw_resp_text = json.dumps(final_response.dict(), indent=2)
+        # 10) Instead of using MessageToDict (which expects a protobuf), we dump the pydantic model.
+        if orjson_available:
+            raw_resp_text = orjson.dumps(
+                final_response.model_dump(mode="json"), option=orjson.OPT_INDENT_2
+            ).decode()
+        else:
+            raw_resp_text = json.dumps(final_response.model_dump(mode="json"), indent=2)
 
         # 11) Base64-encode the screenshots for later display in the frontend.
-        screenshot_data = []
-        for path in screenshot_paths:
-            try:
-                with open(path, "rb") as f:
-                    raw_bytes = f.read()
-                    b64_str = base64.b64encode(raw_bytes).decode("utf-8")
-                screenshot_data.append({
-                    "filename": path,
-                    "base64_data": b64_str
-                })
-            except Exception as e:
-                print(f"Warning: Could not base64-encode {path}: {e}")
+        #     The payload stays as bytes; it is decoded only when serialised.
+        screenshot_data = list(await asyncio.gather(*[
+            asyncio.to_thread(self._encode_screenshot, frame)
+            for frame in frames
+        ]))
 
-        
-
-        # 12) Clear the perception screenshots directory
-        perception_dir = os.path.join("src", "core", "screenshots", "perception")
-        for file_path in glob.glob(os.path.join(perception_dir, "*")):
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
+        # 12) Clear the perception screenshots directory (in-memory captures write nothing)
+        if not hasattr(emulator, "get_screenshot_perception_bytes"):
+            perception_dir = os.path.join("src", "core", "screenshots", "perception")
+            for file_path in glob.glob(os.path.join(perception_dir, "*")):
+                try:
+                    os.remove(file_path)
+                except Exception:
+                    pass
 
         # 13) Return all necessary data
         return (
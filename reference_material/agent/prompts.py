@@ -4,561 +4,254 @@
 # ──────────────────────────────────────────────────────────────────────────────
 from __future__ import annotations
 
-import base64
-import io
-import json
-import os
+import string
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from textwrap import dedent
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
 
-from PIL import Image
+try:
+    import orjson
 
+    orjson_available = True
+except ImportError:
+    import json
 
-# ╭──────────────────────────────────────────────────────────────────────────╮
-# │ RAW TEMPLATE STRINGS – kept 100 % identical to those in MainAgent       │
-# ╰──────────────────────────────────────────────────────────────────────────╯
+    orjson_available = False
 
-THINKING_SYSTEM_OVERWORLD = dedent(
-    """
-    **Subject: Overworld Exploration and Planning - Project: Kanto Adventure**
-    **Role:** Pokémon FireRed Explorer - You are the PLAYER!
-    **Objective:** Plan your next steps in the overworld, focusing on exploration and progression.
-    **Player Mindset:** You are an adventurous Pokémon trainer, exploring the Kanto region. Think like a player making strategic decisions.
-    **Thinking Directives:**
-    1.  **Analyze the Environment:** Prioritize the following data in your analysis (Current Environment Snapshot):
-        - **tile_map:** (Primary map data, most accurate, csv of all tiles in the map you can and have seen)
-        - **traversal_map:** (Secondary map data, less accurate, csv of all traversed tiles in the map)
-        - **Screenshot:** (Visual context, use to supplement tile_map/traversal_map)
-        NOTE1: Tile_map and traversal_map are more spatially accurate than your base vision abilities.
-        NOTE2:Use player data (X, Y, Facing Direction, Facing Tile) to identify your location on the map.
-    2.  **Plan Your Approach:** Formulate a strategy for your next move, focusing on exploration and achieving your goals.
-    3.  **Creative Thinking:** Be creative and adventurous! Consider hidden areas, potential items, and the best path forward.
-    4.  **Justify Your Reasoning:** Explain why you're choosing this strategy, referencing the environment and your goals.
-    5.  **Big Picture Perspective:** Think about the long-term implications of your decisions and how they contribute to becoming the Pokémon Champion.
-
-    ────────────────────────  MEMORY MODEL  ────────────────────────
-    • **PLAN SUMMARY expire quickly** – each thought block is visible
-    for only a few iterations (see “Recent PLAN SUMMARY” below) and
-    then vanishes forever.
-    • **Knowledge Base persists** – anything you save via `write_to_memory`
-    or `update_goal` is re-loaded on the very next iteration (and all
-    future ones).
-    • **Guideline:** if a fact, clue, route, NPC note, plan, or to-do item
-    will matter beyond this immediate turn, store it in the Knowledge Base or goals
-    **now** before it scrolls out of the window if it isnt already there.
-    ──────────────────────────────────────────────────────────────────
-
-
-    ────────────────────  ACTION RULES FOR EACH ITERATION  ────────────────────
-    • You may issue one game-world input (or a short, ordered chain) in this iteration.
-        EX1. a single `press_gba_button [button]` call
-        EX2. a single `overworld_navigator` call (NOTE: OverworldNavigator will be a lot of moves in a row dont chain multiple in a row)
-        EX3. multiple `press_gba_button [button]` calls
-        
-    • In addition—or instead—you may freely call the **internal tools**
-    `write_to_memory` and `update_goal` as many times as needed.
-
-    • Before deciding on the game input, ask yourself:
-    ① Do I want to remember ANYTHING from the scene or from my thoughts?
-        → call `write_to_memory("…")`
-    ② Does this new information change my agenda?
-        → call `update_goal(action="add" | "remove", goal_text="…")`
-    ③ Then choose the most useful game input(s) for progress.
-
-    • Output your tool calls in the order:  
-    all memory/goal updates → the one world-interaction tool.
-    ────────────────────────────────────────────────────────────────────────────
-
-    ─────────── PLAN SUMMARY HAND-OFF  ───────────
-    Everything you write in this phase is forwarded verbatim to a
-    separate **ACTION AGENT** immediately after you finish thinking.
-    That agent will choose and execute tool calls based *solely* on
-    your FINAL ACTIONS
-    Guidelines:
-    • Think out loud with enough clarity that the action agent knows
-    exactly what to do next..
-    • Your PLAN SUMMARY will also be send to future iterations 
-    of the thinking agent, so be sure to write them in a way that
-    makes sense to you in the future.
-    ──────────────────────────────────────────────────────────────
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➍ — Single-Tile Movement
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Context
-    • Player at (X=10, Y=15) on Viridian Route, facing arbitrary.
-    • An item sparkle on the tile directly north at (10, 14).
-    Problem
-    • Need exactly one tile movement upward to pick it up.
-    • No hazards or obstacles in adjacent tile.
-    Execution sketch
-    1. move one tile Up.
-    --- FINAL ACTIONS --------------------------------------------------------------
-    move_player("Up")
-
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➎ — Facing Adjustment
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Context
-    • Player at (X=8, Y=12) on Route 2, currently facing Left.
-    • A signpost is directly above at (8, 11); interaction requires facing Up.
-    Problem
-    • Must rotate on the spot to face Up without moving.
-    Execution sketch
-    1. turn to face Up.
-    --- FINAL ACTIONS --------------------------------------------------------------
-    turn_player("Up")
-
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➏ — Player Interaction
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Context
-    • Player at (X=5, Y=7) in Pewter City, facing the Poké Mart counter.
-    • Interaction with the clerk opens purchase menu.
-    Problem
-    • Single button press ‘A’ triggers interaction.
-    Execution sketch
-    1. press A to open shop menu.
-    --- FINAL ACTIONS --------------------------------------------------------------
-    player_interact("A")
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF  PLAN SUMMARY ➐ — Memory Write
-    ################################################################################
-    --- THOUGHTS & PLANS -----------------------------------------------------------
-    Context
-    • Explored tunnel section beneath Route 3.
-    • Discovered hidden alcove at map coords (3,7) containing Rare Candy.
-    Problem
-    • Persist discovery for later return or item recovery.
-    Execution sketch
-    1. write fact "secret_alcove=(x=3,y=7) with Rare Candy" into KB.
-    --- FINAL ACTIONS --------------------------------------------------------------
-    write_to_memory("secret_alcove=(x=3,y=7) with Rare Candy")
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➑ — Pathfinding Navigation
-    ################################################################################
-    --- THOUGHTS & PLANS -----------------------------------------------------------
-    Snapshot
-    • Current pos: (X=5, Y=5) on Route 4, facing North.
-    • Destination: Lavender Town entrance at (X=12, Y=3).
-    Hazards
-    • Grass patches at rows Y=6 and Y=4 (avoid if possible).
-    Strategy
-    • A* path through columns X=5→8→12, rows Y=5→3.
-    • Let navigator handle steering and obstacle avoidance.
-    Execution sketch
-    1. invoke overworld pathfinder to (12,3).
-    --- FINAL ACTIONS --------------------------------------------------------------
-    overworld_navigator(destination_x=12, destination_y=3)
-
-
-    ─────────────────────────  OUTPUT POLICY  ─────────────────────────
-    • Reply **in two blocks, and only these blocks**:
-
-        --- THOUGHTS & PLANS ---
-        (free-form monolouge; any length)
-
-        --- FINAL ACTIONS ---
-        (one or more exact function calls, one per line)
-
-    • `--- FINAL ACTIONS ---` may contain:
-    // move_player schema — all valid GBA directions
-    { "button": "Up" }
-    { "button": "Down" }
-    { "button": "Left" }
-    { "button": "Right" }
-
-    // turn_player schema — all valid GBA directions
-    { "button": "Up" }
-    { "button": "Down" }
-    { "button": "Left" }
-    { "button": "Right" }
-
-    // player_interact schema — all valid GBA face buttons
-    { "button": "A" }
-    { "button": "B" }
-    { "button": "Start" }
-    { "button": "Select" }
-
-    // write_to_memory schema
-    { "text": "secret_alcove=(x=3,y=7) with Rare Candy" }
-
-    // update goal schema
-    { action":"text": "secret_alcove=(x=3,y=7) with Rare Candy" }
-
-    // overworld_navigator schema
-    { 12, 3 } [intended x, y coords]
-    
-    // update goal schema
-    { "action": add, "text": "catch a pidgey" }
-    { "action": remove, "text": "catch a pidgey" }
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
 
-    **YOUR MISSION IN LIFE: Become the best Pokémon Trainer!**
-    **Think like a player and plan your next move!**
-    """
-).strip()
+try:
+    import xxhash
 
-THINKING_SYSTEM_GENERAL = dedent(
-    """
-    **Subject: Gameplay Decision Making - Project: Kanto Adventure**
-    **Role:** Pokémon FireRed Player - It's your turn!
-    **Objective:** Decide your next move, acting as a human player would in this situation.
-    **Player Mindset:** You are deeply immersed in the game. Think creatively and intuitively, just like a real player.
-    **Thinking Directives:**
-    1.  **Recall Your Thoughts:** Remember your previous thoughts and analysis.
-    2.  **Make a Player Decision:** Choose the best course of action based on your understanding of the game and your personal goals.
-    3.  **Creative and Adventurous Play:** Explore, experiment, and make decisions that feel right to you as a player.
-    4.  **Justify Your Approach:** Explain your reasoning, considering the Current Environment Snapshot and your overall goals.
-    5.  **Map Data Priority:** Prioritize tile_map data, then screenshot data, then traversal_map data, when available, to help inform your decisions. Player data can be used to identify your location.
-    **Available Tools (for reference only, no direct tool use here):**
-    * press_gba_button(button): Execute a button press on the Game Boy Advance.
-    * write_to_memory(fact): Record a concise observation. 
-    * update_goal(goal_change): Modify your goals.
-
-
-    ────────────────────────  MEMORY MODEL  ────────────────────────
-    • **PLAN SUMMARY expire quickly** – each thought block is visible
-    for only a few iterations (see “Recent PLAN SUMMARY” below) and  
-    then vanishes forever.
-    • **Knowledge Base persists** – anything you save via `write_to_memory`
-    or `update_goal` is re-loaded on the very next iteration (and all
-    future ones).
-    • **Guideline:** if a fact, clue, route, NPC note, plan, or to-do item
-    will matter beyond this immediate turn, store it in the Knowledge Base or goals
-    **now** before it scrolls out of the window if it isnt already there.
-    ──────────────────────────────────────────────────────────────────
-
-    ────────────────────  ACTION RULES FOR EACH ITERATION  ────────────────────
-    • You may issue one game-world input (or a short, ordered chain) in this iteration.
-        EX1. a single `press_gba_button [button]` call
-        EX2. multiple `press_gba_button [button]` calls
-        
-    • In addition—or instead—you may freely call the **internal tools**
-    `write_to_memory` and `update_goal` as many times as needed.
-
-    • Before deciding on the game input, ask yourself:
-    ① Do I want to remember ANYTHING from the scene or from my thoughts?
-        → call `write_to_memory("…")`
-    ② Does this new information change my agenda?
-        → call `update_goal(action="add" | "remove", goal_text="…")`
-    ③ Then choose the single most useful game input for progress.
-
-    • Output your tool calls in the order:  
-    all memory/goal updates → the one world-interaction tool.
-    ────────────────────────────────────────────────────────────────────────────
-
-    ─────────── PLAN SUMMARY HAND-OFF  ───────────
-    Everything you write in this phase is forwarded verbatim to a
-    separate **ACTION AGENT** immediately after you finish thinking.
-    That agent will choose and execute tool calls based *solely* on
-    your FINAL ACTIONS
-    Guidelines:
-    • Think out loud with enough clarity that the action agent knows
-    exactly what to do next..
-    • Your PLAN SUMMARY will also be send to future iterations 
-    of the thinking agent(youself), so be sure to write them in a way that
-    makes sense to you in the future.
-    ──────────────────────────────────────────────────────────────
-
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➊ — Name-entry 
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Context recap
-    • Current name buffer: "AW"
-    • Cursor tile: “U” (bottom-row index 2)
-    • Keyboard layout (bottom row, absolute indices)
-    0:S  1:TUV  2:WXYZ 
-    Problem
-    • Need final buffer = "ASH"
-    • “S” is absolute index 0; one LEFT from “TUV” lands there.
-    • After inserting “S”, cursor auto-jumps one tile RIGHT (to “TUV” again).
-    • From “TUV” the shortest path to “H” is: UP×2 → LEFT×4.
-    Persisted facts
-    • [KB] cursor_coords=(row=2,col=1)  # bottom row, on TUV
-    • [KB] target_letter="S"
-    Execution sketch
-    1. LEFT → cursor on “S”.
-    2. A     → buffer becomes "AWS"; cursor returns to “TUV”.
-    3. UP,UP,LEFT×4,A → buffer “ASH”; task finished.
-
-    --- FINAL ACTIONS --------------------------------------------------------------
-    write_to_memory("cursor=(row2,col1);target=S")
-    press_gba_button("Left")
-    press_gba_button("A")
-    press_gba_button("Up")
-    press_gba_button("Up")
-    press_gba_button("Left")
-    press_gba_button("Left")
-    press_gba_button("Left")
-    press_gba_button("Left")
-    press_gba_button("A")
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➋ — Overworld positioning + route plan
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Snapshot
-    • Map: Route 1 tile_map loaded, PC at (X=12,Y=22), facing UP.
-    • Bag: 1 Potion, 1 Town Map. Rival battle done.
-    Goal stack
-    1. Reach Viridian before dusk (Y<=5).
-    2. Buy 3 Poké Balls.
-    Hazards
-    • Tall-grass bands at rows Y=18 and Y=14 (tile ids 23,24).
-    Strategy
-    • Zig-zag around grass via safe columns X = 10 and X = 12.
-    • Heal if HP≤12; current HP=30 so skip.
-    Memory update
-    • Record safe corridor coords for future return journey.
-
-    --- FINAL ACTIONS --------------------------------------------------------------
-    update_goal(action="add", goal_text="Buy 3 Poke Balls in Viridian Mart")
-    write_to_memory("safe_corridor_cols=[10,12] on Route1")
-    press_gba_button("Up")
-    press_gba_button("Right")
-    press_gba_button("Up")
-    press_gba_button("Up")
-    press_gba_button("Left")
-    press_gba_button("Up")
-    ################################################################################
-    # FEW-SHOT EXAMPLE OF PLAN SUMMARY ➌ — Battle turn (trainer fight)
-    ################################################################################
-    --- PLAN SUMMARY -----------------------------------------------------------
-    Battle state
-    • My team: Bulbasaur Lv8 (HP 19/25) @front, Tackle/Leech Seed.
-    • Foe: Pidgey Lv6 (HP 60 %), may use Gust (sup-effective).
-    Risk analysis
-    • One Gust ≈ 12 HP. Safe only if HP≥14.
-    • Potion available (heals 20).
-    Decision tree
-    A. Seed then Potion-stall → 2 turns; guarantees win, zero faint risk.
-    B. Immediate switch to Pikachu Lv3 → too low level.
-    Choose path A.
-
-    --- FINAL ACTIONS --------------------------------------------------------------
-    press_gba_button("Down")   # move to Leech Seed
-    press_gba_button("A")
-
-    ─────────────────────────  OUTPUT POLICY  ─────────────────────────
-    • Reply **in two blocks, and only these blocks**:
-
-        --- THOUGHTS & PLANS ---
-        (free-form reasoning; any length)
-
-        --- FINAL ACTIONS ---
-        (one or more exact function calls, one per line)
-
-    • `--- FINAL ACTIONS ---` may contain
-        press_gba_button("…")
-        write_to_memory("…")
-        update_goal("…")
-      Nothing else—no markdown, no prose, no blank lines before/after.
-
-    • If no memory/goal updates are needed, omit them; still output
-      at least **one** `press_gba_button`.
-
-    • Any reply that deviates from this template is invalid and will be
-      discarded by the runtime.
-    ──────────────────────────────────────────────────────────────────
+    xxhash_available = True
+except ImportError:
+    import hashlib
 
+    xxhash_available = False
 
+# Raw template strings – kept 100 % identical to those in MainAgent, stored
+# pre-dedented so no whitespace processing happens at import time.
+from src.agent.prompts_compiled import (
+    ACTION_SYSTEM_GENERAL,
+    ACTION_SYSTEM_OVERWORLD,
+    THINKING_SYSTEM_GENERAL,
+    THINKING_SYSTEM_OVERWORLD,
+)
 
-    
-    **YOUR MISSION IN LIFE:** Become the best Pokémon Trainer!
-    **Think like a player and decide your next move!**
+# Imaging libraries are imported inside the screenshot helpers, so importing
+# this module for its templates alone does not pay for Pillow.
+if TYPE_CHECKING:
+    from PIL import Image
 
+    from src.agent.memory.memory_manager import RecentAction
 
-    """
-).strip()
 
-ACTION_SYSTEM_OVERWORLD = dedent(
+# ╭──────────────────────────────────────────────────────────────────────────╮
+# │ Helper: screenshot → Base-64 data-URL                                    │
+# ╰──────────────────────────────────────────────────────────────────────────╯
+def encode_screenshot_from_image(img: Image.Image, upscale_factor: int = 1) -> str:
     """
-    ╔═══════════════════════════════════════════════════════════════════════╗
-    ║  POKéMON FIRERED • ACTION-AGENT (STRICT ECHO MODE)                   ║
-    ╚═══════════════════════════════════════════════════════════════════════╝
-
-    READ ME -- HARD CONTRACT
-    ─────────────────────────────────────────────────────────────────────────
-    You will receive a Thinking-agent message that contains **exactly one**
-    block like this:
-
-        --- FINAL ACTIONS ---
-        player_interact("A")
-        write_to_memory("cursor_row=2")
-        update_goal("add:Catch Pidgey")
-
-    Your job is to turn *each* line inside that block into an **VALID**
-    function call.  NOTHING else.
-
-
+    Return a `data:image/webp;base64,...` string for an in-memory image.
 
-    You must emit a **line-for-line replica**, correcting only
-    *trivial* formatting errors that would break the schema  
-    (e.g. wrong-case button names, stray spaces).
-
-    ───────────────────────────────── SCHEMA ───────────────────────────────
-      • move_player("Up|Down|Left|Right")
-      • turn_player("Up|Down|Left|Right")
-      • player_interact("A|B|Start|Select")
-      • overworld_navigator(destination_x(#), destination_y(#))
-      • write_to_memory("…")
-      • update_goal("…")
-    ─────────────────────────────────────────────────────────────────────────
-
-    ALLOWED FIXES (examples) ───────────────────────────────────────────────
-      Input line                     →   You output
-      ───────────────────────────────────────────────────────────────────────
-      turn_player("left")            →        FUNCTION CALL FOR: turn_player("LEFT")
-      player_interact( "A" )         →        FUNCTION CALL FOR: player_interact("A")
-      move_player("UP ")             →        FUNCTION CALL FOR: move_player("UP")
-      overworld_navigator(destination_x=12, destination_y=3)  →   FUNCTION CALL FOR: overworld_navigator(destination_x=12, destination_y=3)
-      write_to_memory( "foo" )       →        FUNCTION CALL FOR: write_to_memory("foo")
-      update_goal( "add:Catch", )    →        FUNCTION CALL FOR: update_goal("add:Catch")
-
-    UNALLOWED CHANGES
-      ✘ Re-ordering or skipping lines
-      ✘ Adding commentary or blank lines
-      ✘ Inventing new calls
-      ✘ Editing user text inside memory/goal strings
+    The vision model rescales its input itself, so the native frame is sent
+    by default; pass ``upscale_factor > 1`` for a nearest-neighbour blow-up
+    (e.g. to eyeball logged screenshots).
+    """
+    import io
+    from PIL import Image
 
-    OUTPUT EXACTLY ONE FUNCTION CALL FOR EVERY LINE IN --- FINAL ACTIONS ---  
+    if upscale_factor > 1:
+        img = img.resize(
+            (img.width * upscale_factor, img.height * upscale_factor), Image.NEAREST
+        )
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=90, method=4)
+    encoded = _b64.b64encode(buf.getvalue()).decode("ascii")
+    return f"data:image/webp;base64,{encoded}"
 
-    RULE REMINDER →  The number and order of objects in `tool_calls`
-    **must match** the number and order of lines inside `--- FINAL ACTIONS ---`.
 
-    **ADHERE TO THE SCHEMA**
+# Data URLs of recently encoded screenshots, keyed by (content hash, upscale).
+# Menus, dialogue and idle turns often produce byte-identical frames.
+_SCREENSHOT_CACHE: OrderedDict[Tuple[int | bytes, int], str] = OrderedDict()
+_SCREENSHOT_CACHE_SIZE = 64
+_SCREENSHOT_CACHE_LOCK = threading.Lock()  # encodes run on _ENCODE_POOL
 
-    Deviation ⇒ **INVALID** response.
 
-    ─────────────────────────────────────────────────────────────
+def encode_screenshot(img_path: str, upscale_factor: int = 1) -> str:
     """
-).strip()
-
-ACTION_SYSTEM_GENERAL = dedent(
+    File-based wrapper around encode_screenshot_from_image. Identical files
+    reuse the previous data URL. Removes the original file afterwards.
     """
-    ╔═══════════════════════════════════════════════════════════════════════╗
-    ║  POKéMON FIRERED • ACTION-AGENT (STRICT ECHO MODE)                   ║
-    ╚═══════════════════════════════════════════════════════════════════════╝
-
-    READ ME -- HARD CONTRACT
-    ─────────────────────────────────────────────────────────────────────────
-    You will receive a Thinking-agent message that contains **exactly one**
-    block like this:
-
-        --- FINAL ACTIONS ---
-        press_gba_button("A")
-        write_to_memory("cursor_row=2")
-        update_goal("add:Catch Pidgey")
-
-    Your job is to turn *each* line inside that block into an **VALID**
-    function call.  NOTHING else.
-
+    import io
+    from PIL import Image
+
+    with open(img_path, "rb") as f:
+        raw = f.read()
+    if xxhash_available:
+        digest = xxhash.xxh3_64_intdigest(raw)
+    else:
+        digest = hashlib.blake2b(raw, digest_size=8).digest()
+    key = (digest, upscale_factor)
+
+    with _SCREENSHOT_CACHE_LOCK:
+        data_url = _SCREENSHOT_CACHE.get(key)
+        if data_url is not None:
+            _SCREENSHOT_CACHE.move_to_end(key)
+
+    if data_url is None:
+        with Image.open(io.BytesIO(raw)) as img:
+            data_url = encode_screenshot_from_image(img, upscale_factor)
+        with _SCREENSHOT_CACHE_LOCK:
+            _SCREENSHOT_CACHE[key] = data_url
+            if len(_SCREENSHOT_CACHE) > _SCREENSHOT_CACHE_SIZE:
+                _SCREENSHOT_CACHE.popitem(last=False)
+
+    Path(img_path).unlink(missing_ok=True)
+    return data_url
+
+
+
+# Last knowledge base seen by the builders and its serialisation. The KB dict is
+# mutated in place by MemoryManager, so a shallow snapshot (values are str) is
+# kept to detect changes rather than relying on object identity.
+_KB_CACHE: Tuple[Dict[str, Any] | None, str] = (None, "")
+
+
+def dump_knowledge_base(knowledge_base: Dict[str, Any]) -> str:
+    """Indented JSON dump of the knowledge base, reused while it is unchanged."""
+    global _KB_CACHE
+    snapshot, dumped = _KB_CACHE
+    if snapshot is not None and snapshot == knowledge_base:
+        return dumped
+    # Sorted keys keep the dump byte-stable when entries are added or removed.
+    if orjson_available:
+        dumped = orjson.dumps(
+            knowledge_base, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        ).decode("utf-8")
+    else:
+        dumped = json.dumps(knowledge_base, indent=2, sort_keys=True, ensure_ascii=False)
+    _KB_CACHE = (dict(knowledge_base), dumped)
+    return dumped
+
+
+def fmt_action_block(hist: list[list[RecentAction]], max_iters: int = 5) -> str:
+    """Format recent tool calls for prompt inclusion.
 
+    The list ``hist`` is expected to contain one list of ``RecentAction``
+    tuples per iteration.  This formatter presents the most
+    recent iterations first (``Iter -1`` being the immediately
+    previous iteration).  Each tool call shows its name, arguments and
+    either the perception summary or the failure reason if the call
+    errored out.
+    """
 
-    You must emit a **line-for-line replica**, correcting only
-    *trivial* formatting errors that would break the schema  
-    (e.g. wrong-case button names, stray spaces).
+    recent = hist[-max_iters:]
+    if not recent:
+        return "None"
 
-    ───────────────────────────────── SCHEMA ───────────────────────────────
-      • press_gba_button("UP|DOWN|LEFT|RIGHT|A|B|L|R|Start|Select")
-      • write_to_memory("…")
-      • update_goal("…")
-    ─────────────────────────────────────────────────────────────────────────
+    def _lines():
+        for idx, iteration in enumerate(reversed(recent), 1):
+            yield f"Iter -{idx}: "
+            if not iteration:
+                yield ""
+            for a in iteration:
+                if a.err_reason is not None:
+                    yield f"  • {a.name} {a.args} ⇒ {{Tool call failed ⇒ Reason: {a.err_reason}}}"
+                elif a.ga:
+                    yield f"  • {a.name} {a.args} ⇒ {a.ga}"
+                else:
+                    yield f"  • {a.name} {a.args} ⇒"
 
-    ALLOWED FIXES (examples) ───────────────────────────────────────────────
-      Input line                     →   You output
-      ───────────────────────────────────────────────────────────────────────
-      press_gba_button("left")       →   FUNCTION CALL FOR: press_gba_button("LEFT")
-      press_gba_button( "A" )        →   FUNCTION CALL FOR: press_gba_button("A")
-      press_gba_button("UP ")        →   FUNCTION CALL FOR: press_gba_button("UP")
-      write_to_memory( "foo" )       →   FUNCTION CALL FOR: write_to_memory("foo")
-      update_goal( "add:Catch", )    →   FUNCTION CALL FOR: update_goal("add:Catch")
+    return "\n".join(_lines())
 
-    UNALLOWED CHANGES
-      ✘ Re-ordering or skipping lines
-      ✘ Adding commentary or blank lines
-      ✘ Inventing new calls
-      ✘ Editing user text inside memory/goal strings
 
-    OUTPUT EXACTLY ONE FUNCTION CALL FOR EVERY LINE IN --- FINAL ACTIONS ---  
 
-    RULE REMINDER →  The number and order of objects in `tool_calls`
-    **must match** the number and order of lines inside `--- FINAL ACTIONS ---`.
 
-    **ADHERE TO THE SCHEMA**
 
-    Deviation ⇒ **INVALID** response.
+# Screenshot encoding runs here while the builder assembles the text prompt;
+# Pillow releases the GIL in its C encode paths.
+_ENCODE_POOL = ThreadPoolExecutor(max_workers=2)
 
-    ─────────────────────────────────────────────────────────────
+def compile_template(src: str) -> Callable[..., str]:
     """
-).strip()
-
-
-# ╭──────────────────────────────────────────────────────────────────────────╮
-# │ Helper: screenshot → Base-64 data-URL                                    │
-# ╰──────────────────────────────────────────────────────────────────────────╯
-def encode_screenshot(img_path: str, upscale_factor: int = 4) -> str:
+    Specialise a ``str.format``-style template into a render function that
+    takes its fields as keyword arguments (string values) and returns
+    ``"".join`` of the literal chunks and values. Only bare ``{name}``
+    fields are supported.
     """
-    Open an image, upscale with Lanczos, and return a `data:image/png;base64,...`
-    string. Removes the original file afterwards.
+    namespace: Dict[str, Any] = {}
+    fields: List[str] = []
+    pieces: List[str] = []
+    for literal, field, spec, conversion in string.Formatter().parse(src):
+        if literal:
+            const = f"_P{len(namespace)}"
+            namespace[const] = literal
+            pieces.append(const)
+        if field is not None:
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            if field not in fields:
+                fields.append(field)
+            pieces.append(field)
+
+    params = f"*, {', '.join(fields)}" if fields else ""
+    exec(f"def _render({params}):\n    return ''.join(({', '.join(pieces)},))", namespace)
+    return namespace["_render"]
+
+
+# Static user-message templates, dedented once at import and compiled into
+# render functions. Sections run from slowest- to fastest-changing so the
+# provider's prompt-prefix cache covers as much of the message as possible.
+_THINKING_USER_TMPL = dedent(
     """
-    img = Image.open(img_path)
-    upscaled = img.resize(
-        (img.width * upscale_factor, img.height * upscale_factor), Image.NEAREST
-    )
-    buf = io.BytesIO()
-    upscaled.save(buf, format="PNG")
-    encoded = base64.b64encode(buf.getvalue()).decode("utf-8")
-
-    if os.path.exists(img_path):
-        os.remove(img_path)
-    return f"data:image/png;base64,{encoded}"
+    <-- Knowledge Base: -->
+    {kb_dump}
+    ======================
 
+    <-- Goals: -->
+    {goals_txt}
+    ======================
 
+    <-- Medium-Term Context: -->
+    {medium_ctx}
+    ======================
 
-def fmt_action_block(hist: list[list[dict]], max_iters: int = 5) -> str:
-    """Format recent tool calls for prompt inclusion.
+    <-- Environment: -->
+    {textual_state}
+    ======================
 
-    The list ``hist`` is expected to contain one list of tool-call
-    dictionaries per iteration.  This formatter presents the most
-    recent iterations first (``Iter -1`` being the immediately
-    previous iteration).  Each tool call shows its name, arguments and
-    either the perception summary or the failure reason if the call
-    errored out.
-    """
+    <-- Recent Actions/Short-Term Context: (most-recent to last)  -->
+    {action_summary}
+    ======================
 
-    out: list[str] = []
-    recent = hist[-max_iters:]
-    for idx, iteration in enumerate(reversed(recent), 1):
-        lines = []
-        for a in iteration:
-            line = f"  • {a['name']} {a['arguments']}"
-            if a.get("status") == "error" and a.get("error_details"):
-                reason = a["error_details"].get("reason", "")
-                line += f" ⇒ {{Tool call failed ⇒ Reason: {reason}}}"
-            elif (
-                isinstance(a.get("perception_block"), dict)
-                and a["perception_block"].get("general_analysis")
-            ):
-                ga = a["perception_block"]["general_analysis"]
-                line += f" ⇒ {ga}"
-            else:
-                line += " ⇒"
-            lines.append(line)
+    <-- RECENT PLAN SUMMARY: (most-recent to last)  -->
+    {recent_thoughts}
+    ======================
 
-        out.append(f"Iter -{idx}: \n" + "\n".join(lines))
+    
+    [end]
+    Plan your next move and then Provide your PLAN SUMMARY.
+    """
+).strip()
 
-    return "\n".join(out) if out else "None"
+# The action message is a fixed frame around the thinking output.
+_ACTION_USER_PREFIX = "====================== \n\n<-- -->\n**BASE YOUR NEXT ACTIONS ON THE FOLLOWING**\n"
+_ACTION_USER_SUFFIX = "\n\n<-- -->"
 
+_render_thinking_user = compile_template(_THINKING_USER_TMPL)
 
 
+# (system prompt, prompt cache key) per mode; every other mode uses the default.
+_THINKING_SYS = {"OVERWORLD": (THINKING_SYSTEM_OVERWORLD, "thinking-overworld")}
+_THINKING_SYS_DEFAULT = (THINKING_SYSTEM_GENERAL, "thinking-general")
+_ACTION_SYS = {"OVERWORLD": (ACTION_SYSTEM_OVERWORLD, "action-overworld")}
+_ACTION_SYS_DEFAULT = (ACTION_SYSTEM_GENERAL, "action-general")
 
 
 # ╭──────────────────────────────────────────────────────────────────────────╮
@@ -568,119 +261,84 @@ def build_thinking_prompt(
     mode: str,
     emulator,  # we only need it for the screenshot
     textual_state: str,
-    short_ctx: str,
     medium_ctx: str,
     goals_txt: str,
     knowledge_base: Dict[str, Any],
     recent_thoughts,
-    recent_actions:  list[list[dict]]
+    recent_actions:  list[list[RecentAction]]
 ) -> Dict[str, Any]:
     """
     Replicates MainAgent._thinking_phase_prompt but lives here now.
     Returns:
         {
           "messages": [ ... ],
-          "main_screenshot": "<data-url>"
+          "main_screenshot": "<data-url>",
+          "prompt_cache_key": "<static system prompt id>"
         }
     """
-    mode = mode.upper()
-    system_msg = (
-        THINKING_SYSTEM_OVERWORLD if mode == "OVERWORLD" else THINKING_SYSTEM_GENERAL
-    )
+    system_msg, cache_key = _THINKING_SYS.get(mode.upper(), _THINKING_SYS_DEFAULT)
 
+    # screenshot – encoded in the background while the text is assembled.
+    # Read the frame buffer directly when the emulator offers it, skipping the
+    # temp-file round-trip.
+    get_frame_buffer = getattr(emulator, "get_frame_buffer", None)
+    if get_frame_buffer is not None:
+        from PIL import Image
 
+        screenshot_future = _ENCODE_POOL.submit(
+            encode_screenshot_from_image, Image.fromarray(get_frame_buffer())
+        )
+    else:
+        screenshot_future = _ENCODE_POOL.submit(encode_screenshot, emulator.get_screenshot())
 
     action_summary = fmt_action_block(recent_actions, max_iters=30)
 
-    kb_dump = json.dumps(knowledge_base, indent=2)
-
-    user_msg = dedent(
-        f"""
-        <-- RECENT PLAN SUMMARY: (most-recent to last)  -->
-        {recent_thoughts or '[none]'}
-        ======================
-        
-        <-- Recent Actions/Short-Term Context: (most-recent to last)  -->
-        {action_summary}
-        ======================
-
-        <-- Environment: -->
-        {textual_state}
-        ======================
-
-        <-- Medium-Term Context: -->
-        {medium_ctx}
-        ======================
-
-        <-- Goals: -->
-        {goals_txt}
-        ======================
-
-        <-- Knowledge Base: -->
-        {kb_dump if kb_dump.strip() else "(empty)"}
-        ======================
-
-        
-        [end]
-        Plan your next move and then Provide your PLAN SUMMARY.
-        """
-    ).strip()
+    kb_dump = dump_knowledge_base(knowledge_base)
+
+    user_msg = _render_thinking_user(
+        recent_thoughts=recent_thoughts or "[none]",
+        action_summary=action_summary,
+        textual_state=textual_state,
+        medium_ctx=medium_ctx,
+        goals_txt=goals_txt,
+        kb_dump=kb_dump if kb_dump.strip() else "(empty)",
+    )
     
-    # screenshot
-    screenshot_path = emulator.get_screenshot()
-    data_url = encode_screenshot(screenshot_path)
+    data_url = screenshot_future.result()
 
+    # Most stable content first so consecutive requests share the longest
+    # cacheable prefix; the per-turn screenshot goes last.
     messages: List[Dict[str, Any]] = [
         {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg},
         {
             "role": "user",
             "content": [
                 {"type": "image_url", "image_url": {"url": data_url}},
             ],
         },
-        {"role": "user", "content": user_msg},
     ]
 
-    return {"messages": messages, "main_screenshot": data_url}
+    return {
+        "messages": messages,
+        "main_screenshot": data_url,
+        "prompt_cache_key": cache_key,
+    }
 
 
 def build_action_prompt(
     mode: str,
-    textual_state: str,
-    short_ctx: str,
-    medium_ctx: str,
-    goals_txt: str,
     internal_thoughts: str,
-    knowledge_base: Dict[str, Any],
-    recent_thoughts,
-    recent_actions
+    **_ignored,
 ) -> Dict[str, str]:
     """
-    Mirrors MainAgent._choose_action_phase_prompt.
+    Mirrors MainAgent._choose_action_phase_prompt. Extra keyword arguments
+    from the old wider signature are accepted and ignored.
     Returns:
-        { "system": "...", "user": "..." }
+        { "system": "...", "user": "...", "prompt_cache_key": "..." }
     """
-    mode = mode.upper()
-    system_msg = (
-        ACTION_SYSTEM_OVERWORLD if mode == "OVERWORLD" else ACTION_SYSTEM_GENERAL
-    )
-
-    kb_dump = json.dumps(knowledge_base, indent=2)
-
-    action_summary = fmt_action_block(recent_actions, max_iters=30)
-
-    user_msg = dedent(
-        f"""
-        ====================== 
-
-        <-- -->
-        **BASE YOUR NEXT ACTIONS ON THE FOLLOWING**
-        {internal_thoughts}
-
-        <-- -->
-        
+    system_msg, cache_key = _ACTION_SYS.get(mode.upper(), _ACTION_SYS_DEFAULT)
 
-        """
-    ).strip()
+    user_msg = _ACTION_USER_PREFIX + internal_thoughts + _ACTION_USER_SUFFIX
 
-    return {"system": system_msg, "user": user_msg}
+    return {"system": system_msg, "user": user_msg, "prompt_cache_key": cache_key}
@@ -1,7 +1,8 @@
 # src/agent/toolset.py
 import logging
 import json
-import uuid
+import itertools
+import time
 
 class Toolset:
     """
@@ -12,28 +13,34 @@ class Toolset:
     # ------------------------------------------------------------------
     # Canonical-button helpers / constants
     # ------------------------------------------------------------------
-    _VALID_BTNS = {
+    # deterministic order for the schema "enum" lists
+    _VALID_BTNS_ENUM = (
         "A", "B", "Up", "Down", "Left", "Right",
         "L", "R", "Start", "Select"
+    )
+    _VALID_BTNS = frozenset(_VALID_BTNS_ENUM)
+    # retry_payload for attempt 1 and 2, indexed by the current retry count
+    _RETRY_PAYLOADS = (
+        json.dumps({"button": "A", "_retry": 1}),
+        json.dumps({"button": "A", "_retry": 2}),
+    )
+
+    # every accepted spelling → canonical name ("a"/"A" → "A", "LEFT" → "Left", …)
+    _BTN_LOOKUP = {
+        k: v for v in _VALID_BTNS for k in (v, v.lower(), v.upper())
     }
 
-    @staticmethod
-    def _canonical_button(val: str) -> str:
+    @classmethod
+    def _canonical_button(cls, val: str) -> str:
         """
         Normalise “a” → “A”, “left” → “Left”, etc.
-        Returns val unchanged if not a str.
+        Returns val unchanged if not a str or not a known button.
         """
         if not isinstance(val, str):
             return val
         txt = val.strip()
-        if not txt:
-            return val
-        if len(txt) == 1:
-            return txt.upper()
-        lower = txt.lower()
-        if lower in {"start", "select"}:
-            return lower.title()
-        return txt.capitalize()
+        # exact-casing hit is a single probe; mixed case ("uP") falls back to lower()
+        return cls._BTN_LOOKUP.get(txt) or cls._BTN_LOOKUP.get(txt.lower(), val)
 
     # ------------------------------------------------------------------
     def __init__(self, emulator, memory_mgr):
@@ -41,24 +48,47 @@ class Toolset:
         self.memory_mgr = memory_mgr
         self.logger     = logging.getLogger(__name__)
 
+        # KB note keys: start-time prefix keeps keys unique against notes
+        # persisted by earlier runs, the counter keeps them unique within one
+        self._kb_prefix  = f"{int(time.time()):08x}"
+        self._kb_counter = itertools.count()
+
+        # schemas are static – build them once instead of every LLM turn
+        self._schemas_overworld = (
+            self._move_player_schema(),
+            self._turn_player_schema(),
+            self._player_interact_schema(),
+            self._write_to_memory_schema(),
+            self._update_goal_schema(),
+            self._overworld_navigator_schema()
+        )
+        self._schemas_default = (
+            self._press_gba_button_schema(),
+            self._write_to_memory_schema(),
+            self._update_goal_schema(),
+        )
+
+        # tool name → handler; every handler takes
+        # (args, internal_thoughts, short_context, general_perception, mapper, navigator)
+        # and returns a perception block, a {"tool_error": ...} dict, or None
+        # for internal tools that need no perception update.
+        self._dispatch = {
+            "press_gba_button":    self._handle_press_button,
+            "write_to_memory":     self._handle_write_to_memory,
+            "update_goal":         self._handle_update_goal,
+            "overworld_navigator": self._handle_overworld_nav,
+            "move_player":         self._handle_move_player,
+            "turn_player":         self._handle_turn_player,
+            "player_interact":     self._handle_player_interact,
+        }
+
     # ------------------------------------------------------------------
     #  Tool schemas sent to the LLM
     # ------------------------------------------------------------------
     def get_tool_schemas(self, flag:str):
         if flag.upper() == "OVERWORLD":
-            return [
-                self._move_player_schema(),
-                self._turn_player_schema(),
-                self._player_interact_schema(),
-                self._write_to_memory_schema(),
-                self._update_goal_schema(),
-                self._overworld_navigator_schema()
-            ]
-        return [
-            self._press_gba_button_schema(),
-            self._write_to_memory_schema(),
-            self._update_goal_schema(),
-        ]
+            return self._schemas_overworld
+        return self._schemas_default
 
     # ―――  press_gba_button  ―――
     def _press_gba_button_schema(self):
@@ -80,7 +110,7 @@ class Toolset:
                     "properties": {
                         "button": {
                             "type": "string",
-                            "enum": list(self._VALID_BTNS),
+                            "enum": self._VALID_BTNS_ENUM,
                             "description": "Which button to press (A, B, Up, Down, Left, Right, L, R, Start, Select)."
                         }
                     },
@@ -110,7 +140,7 @@ class Toolset:
                     "properties": {
                         "button": {
                             "type": "string",
-                            "enum": list(self._VALID_BTNS),
+                            "enum": self._VALID_BTNS_ENUM,
                             "description": "Which direction to travel (Up, Down, Left, Right)."
                         }
                     },
@@ -140,7 +170,7 @@ class Toolset:
                     "properties": {
                         "button": {
                             "type": "string",
-                            "enum": list(self._VALID_BTNS),
+                            "enum": self._VALID_BTNS_ENUM,
                             "description": "Which direction to face (Up, Down, Left, Right)."
                         }
                     },
@@ -170,7 +200,7 @@ class Toolset:
                     "properties": {
                         "button": {
                             "type": "string",
-                            "enum": list(self._VALID_BTNS),
+                            "enum": self._VALID_BTNS_ENUM,
                             "description": "Which button to press (A, B, L, R, Start, Select)."
                         }
                     },
@@ -303,78 +333,64 @@ class Toolset:
                 }
             }
 
-        if func_name == "press_gba_button":
-            # This handler calls general_perception.analyze_images_and_reasoning
-            # and returns a perception_blk dictionary
-            return self._handle_press_button(
-                args, internal_thoughts, short_context,
-                general_perception, mapper
-            )
-        elif func_name == "write_to_memory":
-            self._handle_write_to_memory(args)
-            return None # Signifies no perception update needed from this tool
-        elif func_name == "update_goal":
-            self._handle_update_goal(args)
-            return None # Signifies no perception update needed from this tool
-        elif func_name == "overworld_navigator":
-            # This handler calls general_perception.analyze_images_and_reasoning (potentially multiple times)
-            # and returns a perception_blk dictionary (e.g., from the last step)
-            return self._handle_overworld_nav(
-                args, internal_thoughts, short_context,
-                general_perception, mapper, navigator
-            )
-        elif func_name == "move_player":
-            return self._handle_move_player(
-                args, internal_thoughts, short_context, general_perception, mapper, navigator
-            )
-        elif func_name == "turn_player":
-            return self._handle_turn_player(
-                args, internal_thoughts, short_context, general_perception, mapper
-            )
-        elif func_name == "player_interact":
-            return self._handle_player_interact(
-                args, internal_thoughts, short_context, general_perception, mapper
-            )
-        else:
+        handler = self._dispatch.get(func_name)
+        if handler is None:
             self.logger.warning(f"Unknown tool function called: {func_name}")
             return {"tool_error": {"name": func_name, "reason": "unknown_tool"}}
+        return handler(
+            args, internal_thoughts, short_context,
+            general_perception, mapper, navigator
+        )
 
     # ------------------------------------------------------------------
-    #  press_gba_button handler with canonicalisation + retry meta
+    #  Button canonicalisation + retry meta (shared by button tools)
     # ------------------------------------------------------------------
-    def _handle_press_button(
-        self,
-        args,
-        internal_thoughts: str,
-        short_context: str,
-        general_perception,
-        mapper
-    ):
+    def _validate_button(self, args, tool_name: str):
+        """
+        Returns (button, None) for a valid button, or (raw, {"tool_error": ...})
+        asking for a retry – or giving up after the third invalid attempt.
+        """
         # auto-normalise casing
         raw       = args.get("button", "A")
         retry_cnt = args.get("_retry", 0)
         button    = self._canonical_button(raw)
 
-        if button not in self._VALID_BTNS:
-            if retry_cnt < 2:
-                self.logger.warning(
-                    f"Invalid BTN '{raw}' → retry {retry_cnt+1}/3"
-                )
-                return {"tool_error": {
-                    "name": "press_gba_button",
-                    "reason": f"invalid_button:{raw}",
-                    "retry_payload": json.dumps(
-                        {"button": "A", "_retry": retry_cnt + 1}
-                    )
-                }}
-            # after three failures—log and give up
-            self.memory_mgr.update_context(
-                f"[ERROR] press_gba_button failed 3× for '{raw}'."
+        if button in self._VALID_BTNS:
+            return button, None
+
+        if retry_cnt < 2:
+            self.logger.warning(
+                f"Invalid BTN '{raw}' → retry {retry_cnt+1}/3"
             )
-            return {"tool_error": {
-                "name": "press_gba_button",
-                "reason": "permanent_invalid"
+            return raw, {"tool_error": {
+                "name": tool_name,
+                "reason": f"invalid_button:{raw}",
+                "retry_payload": self._RETRY_PAYLOADS[retry_cnt]
             }}
+        # after three failures—log and give up
+        self.memory_mgr.update_context(
+            f"[ERROR] {tool_name} failed 3× for '{raw}'."
+        )
+        return raw, {"tool_error": {
+            "name": tool_name,
+            "reason": "permanent_invalid"
+        }}
+
+    # ------------------------------------------------------------------
+    #  press_gba_button handler
+    # ------------------------------------------------------------------
+    def _handle_press_button(
+        self,
+        args,
+        internal_thoughts: str,
+        short_context: str,
+        general_perception,
+        mapper,
+        navigator
+    ):
+        button, error = self._validate_button(args, "press_gba_button")
+        if error:
+            return error
 
         self.logger.info(f"(Tool) press_gba_button => pressing {button}")
 
@@ -407,14 +423,13 @@ class Toolset:
     # ------------------------------------------------------------------
     #  Other tool handlers (no behavioural change)
     # ------------------------------------------------------------------
-    def _handle_write_to_memory(self, args):
+    def _handle_write_to_memory(self, args, *_):
         txt = args.get("text", "")
-        # seconds-based keys collide when many writes happen in the same second
-        key = f"toolnote_{uuid.uuid4().hex[:8]}"             # 8-char id
+        key = f"toolnote_{self._kb_prefix}_{next(self._kb_counter):04x}"
         self.memory_mgr.write_kb(key, txt)
         self.logger.info(f"(Tool) write_to_memory ⇒ {key}")
 
-    def _handle_update_goal(self, args):
+    def _handle_update_goal(self, args, *_):
         if args["action"] == "add":
             self.memory_mgr.add_goal(args["goal_text"])
         else:
@@ -461,32 +476,10 @@ class Toolset:
                                    "reason": moves}}
         return navigator.execute_moves(moves, internal_thoughts, short_context)
     
-    def _handle_turn_player(self, args, internal_thoughts: str, short_context: str, general_perception, mapper):
-        # auto-normalise casing
-        raw       = args.get("button", "A")
-        retry_cnt = args.get("_retry", 0)
-        button    = self._canonical_button(raw)
-
-        if button not in self._VALID_BTNS:
-            if retry_cnt < 2:
-                self.logger.warning(
-                    f"Invalid BTN '{raw}' → retry {retry_cnt+1}/3"
-                )
-                return {"tool_error": {
-                    "name": "turn_player",
-                    "reason": f"invalid_button:{raw}",
-                    "retry_payload": json.dumps(
-                        {"button": "A", "_retry": retry_cnt + 1}
-                    )
-                }}
-            # after three failures—log and give up
-            self.memory_mgr.update_context(
-                f"[ERROR] turn_player failed 3× for '{raw}'."
-            )
-            return {"tool_error": {
-                "name": "turn_player",
-                "reason": "permanent_invalid"
-            }}
+    def _handle_turn_player(self, args, internal_thoughts: str, short_context: str, general_perception, mapper, navigator):
+        button, error = self._validate_button(args, "turn_player")
+        if error:
+            return error
 
         self.logger.info(f"(Tool) turn_player => pressing {button}")
         
@@ -526,32 +519,10 @@ class Toolset:
             "screenshots": shots
         }
     
-    def _handle_player_interact(self, args, internal_thoughts: str, short_context: str, general_perception, mapper):
-        # auto-normalise casing
-        raw       = args.get("button", "A")
-        retry_cnt = args.get("_retry", 0)
-        button    = self._canonical_button(raw)
-
-        if button not in self._VALID_BTNS:
-            if retry_cnt < 2:
-                self.logger.warning(
-                    f"Invalid BTN '{raw}' → retry {retry_cnt+1}/3"
-                )
-                return {"tool_error": {
-                    "name": "player_interact",
-                    "reason": f"invalid_button:{raw}",
-                    "retry_payload": json.dumps(
-                        {"button": "A", "_retry": retry_cnt + 1}
-                    )
-                }}
-            # after three failures—log and give up
-            self.memory_mgr.update_context(
-                f"[ERROR] player_interact failed 3× for '{raw}'."
-            )
-            return {"tool_error": {
-                "name": "player_interact",
-                "reason": "permanent_invalid"
-            }}
+    def _handle_player_interact(self, args, internal_thoughts: str, short_context: str, general_perception, mapper, navigator):
+        button, error = self._validate_button(args, "player_interact")
+        if error:
+            return error
 
         self.logger.info(f"(Tool) player_interact => pressing {button}")
         
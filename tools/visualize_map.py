@@ -5,12 +5,17 @@ Usage:
     python visualize_map.py <path_to_map.json>
     python visualize_map.py <path_to_map.json> --compact
     python visualize_map.py <path_to_map.json> --full
+    python visualize_map.py <path_to_map.json> --grid
+    python visualize_map.py <path_to_map.json> --legend
 """
 
-import json
+import os
 import sys
+from collections import Counter
+from functools import lru_cache
+from itertools import chain, groupby
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable
 
 
 # Tile name abbreviations for compact view
@@ -96,233 +101,274 @@ TILE_ABBREV = {
 }
 
 
+# ANSI foreground colors for traversal markers
+MARKER_COLOR = {
+    'W': '92',  # Green
+    'N': '91',  # Red
+    'P': '94',  # Blue
+    'T': '93',  # Yellow
+    'I': '95',  # Magenta
+}
+
+# Format templates wrapping text in each marker's color; uncolored markers use PLAIN
+PLAIN = "{}"
+COLORED = {marker: f"\033[{code}m{{}}\033[0m" for marker, code in MARKER_COLOR.items()}
+
+# The grid view leaves interactables uncolored
+GRID_COLORED = {marker: template for marker, template in COLORED.items() if marker != 'I'}
+
+
+def colorize_runs(row: Iterable[str], colored: Dict[str, str]) -> str:
+    """Render a traversal row, wrapping each run of identical markers in a single ANSI color sequence"""
+    parts = []
+    for marker, run in groupby(row):
+        count = sum(1 for _ in run)
+        parts.append(colored.get(marker, PLAIN).format(f" {marker} " * count))
+    return "".join(parts)
+
+
+def load_map(json_path: Path) -> Dict[str, Any]:
+    """Load a map JSON file, parsing it straight from a memory map when orjson is available"""
+    # Imported here so only an actual map render pays for the parser import
+    import mmap
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+    with open(json_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if orjson is None:
+            import json
+            return json.loads(mm[:])
+        # orjson reads the mapped pages directly; the view must be released before the map closes
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+@lru_cache(maxsize=32)
+def separator(prefix: str, segment: str, width: int) -> str:
+    """Horizontal rule for a view of the given width, reused across maps of the same size"""
+    return prefix + segment * width
+
+
+def write_output(parts: Iterable[str]):
+    """Write rendered output to stdout in one call, as bytes when the binary buffer is available"""
+    text = "".join(parts)
+    out = sys.stdout
+    buffer = getattr(out, "buffer", None)
+    if buffer is None:
+        out.write(text)
+        return
+    # Do what the text layer would have done: newline translation and encoding
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    out.flush()
+    buffer.write(text.encode(out.encoding or "utf-8", out.errors or "strict"))
+    buffer.flush()
+
+
 def abbreviate_tile(tile_name: str) -> str:
     """Convert tile name to 3-character abbreviation"""
     return TILE_ABBREV.get(tile_name, tile_name[:3].upper())
 
 
+def build_lut(values: Iterable[str], render: Callable[[str], str]) -> Dict[str, str]:
+    """Render each distinct map value once; rows are then emitted by table lookup"""
+    return {value: render(value) for value in values}
+
+
 def visualize_map_compact(json_path: Path):
     """Visualize map with compact 3-letter abbreviations"""
-    with open(json_path, 'r') as f:
-        map_data = json.load(f)
+    map_data = load_map(json_path)
+    parts = []
     
-    print("=" * 100)
-    print(f"MAP: {map_data['map_name']}")
-    print(f"Key: {map_data['map_key']} | Group: {map_data['map_group']} | Number: {map_data['map_number']}")
-    print(f"Bounds: {map_data['bounds']}")
-    print(f"Visits: {map_data['visit_count']} | Created: {map_data['created_at'][:10]}")
-    print("=" * 100)
-    print()
+    parts.append("=" * 100 + "\n")
+    parts.append(f"MAP: {map_data['map_name']}\n")
+    parts.append(f"Key: {map_data['map_key']} | Group: {map_data['map_group']} | Number: {map_data['map_number']}\n")
+    parts.append(f"Bounds: {map_data['bounds']}\n")
+    parts.append(f"Visits: {map_data['visit_count']} | Created: {map_data['created_at'][:10]}\n")
+    parts.append("=" * 100 + "\n")
+    parts.append("\n")
     
     tile_map = map_data['tile_map']
     traversal_map = map_data['traversal_map']
     
     if not tile_map or not traversal_map:
-        print("Map is empty!")
+        parts.append("Map is empty!\n")
+        write_output(parts)
         return
     
-    # Get dimensions
-    height = len(tile_map)
-    width = max(len(row) for row in tile_map) if height > 0 else 0
+    # Count once: the counters feed the statistics and give each map's distinct values
+    tile_counts = Counter(chain.from_iterable(tile_map))
+    trav_counts = Counter(chain.from_iterable(traversal_map))
     
-    print("=" * 100)
-    print("TILE MAP (Compact - 3 Letter Codes)")
-    print("=" * 100)
+    # Get dimensions; 'bounds' holds explored coordinates, not the grid size, so measure the rows
+    width = max(map(len, tile_map), default=0)
+    
+    parts.append("=" * 100 + "\n")
+    parts.append("TILE MAP (Compact - 3 Letter Codes)\n")
+    parts.append("=" * 100 + "\n")
     
     # Header with column numbers
-    print("     ", end="")
-    for x in range(width):
-        print(f"{x:3d} ", end="")
-    print()
-    print("    " + "----" * width)
+    col_header = "     " + "".join(f"{x:3d} " for x in range(width))
+    sep = separator("    ", "----", width)
+    parts.append(col_header + "\n" + sep + "\n")
     
     # Print rows with abbreviations
+    cell_lut = build_lut(tile_counts, lambda tile: f" {abbreviate_tile(tile)}")
     for y, row in enumerate(tile_map):
-        print(f"{y:3d} |", end="")
-        for tile in row:
-            abbrev = abbreviate_tile(tile)
-            print(f" {abbrev}", end="")
-        print()
-    
-    print()
-    print("=" * 100)
-    print("TRAVERSAL MAP")
-    print("=" * 100)
-    print("Legend: ? = Unknown | W = Walkable | N = Blocked | P = Player | T = Traversal | I = Interactable")
-    print("=" * 100)
+        parts.append(f"{y:3d} |" + "".join(map(cell_lut.__getitem__, row)) + "\n")
+    
+    parts.append("\n")
+    parts.append("=" * 100 + "\n")
+    parts.append("TRAVERSAL MAP\n")
+    parts.append("=" * 100 + "\n")
+    parts.append("Legend: ? = Unknown | W = Walkable | N = Blocked | P = Player | T = Traversal | I = Interactable\n")
+    parts.append("=" * 100 + "\n")
     
     # Header
-    print("     ", end="")
-    for x in range(width):
-        print(f" {x:2d}", end="")
-    print()
-    print("    " + "---" * width)
+    col_header = "     " + "".join(f" {x:2d}" for x in range(width))
+    sep = separator("    ", "---", width)
+    parts.append(col_header + "\n" + sep + "\n")
     
-    # Print traversal map with color coding
+    # Print traversal map with color coding (only when writing to a terminal)
+    colored = COLORED if sys.stdout.isatty() else {}
     for y, row in enumerate(traversal_map):
-        print(f"{y:3d} |", end="")
-        for marker in row:
-            # Color code the markers
-            if marker == 'W':
-                print(f" \033[92m{marker}\033[0m ", end="")  # Green
-            elif marker == 'N':
-                print(f" \033[91m{marker}\033[0m ", end="")  # Red
-            elif marker == 'P':
-                print(f" \033[94m{marker}\033[0m ", end="")  # Blue
-            elif marker == 'T':
-                print(f" \033[93m{marker}\033[0m ", end="")  # Yellow
-            elif marker == 'I':
-                print(f" \033[95m{marker}\033[0m ", end="")  # Magenta
-            else:
-                print(f" {marker} ", end="")  # White/default
-        print()
-    
-    print()
-    print_statistics(tile_map, traversal_map)
+        parts.append(f"{y:3d} |" + colorize_runs(row, colored) + "\n")
+    
+    parts.append("\n")
+    parts.append(format_statistics(tile_counts, trav_counts))
+    write_output(parts)
 
 
 def visualize_map_full(json_path: Path):
     """Visualize map with full tile names (original format but better aligned)"""
-    with open(json_path, 'r') as f:
-        map_data = json.load(f)
+    map_data = load_map(json_path)
+    parts = []
     
-    print("=" * 120)
-    print(f"MAP: {map_data['map_name']}")
-    print(f"Key: {map_data['map_key']} | Bounds: {map_data['bounds']} | Visits: {map_data['visit_count']}")
-    print("=" * 120)
-    print()
+    parts.append("=" * 120 + "\n")
+    parts.append(f"MAP: {map_data['map_name']}\n")
+    parts.append(f"Key: {map_data['map_key']} | Bounds: {map_data['bounds']} | Visits: {map_data['visit_count']}\n")
+    parts.append("=" * 120 + "\n")
+    parts.append("\n")
     
     tile_map = map_data['tile_map']
     traversal_map = map_data['traversal_map']
     
     if not tile_map or not traversal_map:
-        print("Map is empty!")
+        parts.append("Map is empty!\n")
+        write_output(parts)
         return
     
-    print("TILE MAP (Full Names)")
-    print("=" * 120)
+    # Count once: the counters feed the statistics and give each map's distinct values
+    tile_counts = Counter(chain.from_iterable(tile_map))
+    trav_counts = Counter(chain.from_iterable(traversal_map))
+    
+    parts.append("TILE MAP (Full Names)\n")
+    parts.append("=" * 120 + "\n")
     
     # Find the longest tile name for alignment
-    max_tile_len = max(len(tile) for row in tile_map for tile in row)
+    max_tile_len = max(map(len, tile_counts))
     max_tile_len = min(max_tile_len, 15)  # Cap at 15 characters
     
     # Print with better formatting
+    # Truncate if needed and pad
+    cell_lut = build_lut(tile_counts, lambda tile: f"{tile[:max_tile_len].ljust(max_tile_len)} ")
     for y, row in enumerate(tile_map):
-        print(f"{y:3d}: ", end="")
-        for tile in row:
-            # Truncate if needed and pad
-            tile_display = tile[:max_tile_len].ljust(max_tile_len)
-            print(f"{tile_display} ", end="")
-        print()
+        parts.append(f"{y:3d}: " + "".join(map(cell_lut.__getitem__, row)) + "\n")
     
-    print()
-    print("TRAVERSAL MAP")
-    print("=" * 120)
+    parts.append("\n")
+    parts.append("TRAVERSAL MAP\n")
+    parts.append("=" * 120 + "\n")
     
+    marker_lut = build_lut(trav_counts, lambda marker: f"{marker:2s} ")
     for y, row in enumerate(traversal_map):
-        print(f"{y:3d}: ", end="")
-        for marker in row:
-            print(f"{marker:2s} ", end="")
-        print()
+        parts.append(f"{y:3d}: " + "".join(map(marker_lut.__getitem__, row)) + "\n")
     
-    print()
-    print_statistics(tile_map, traversal_map)
+    parts.append("\n")
+    parts.append(format_statistics(tile_counts, trav_counts))
+    write_output(parts)
 
 
 def visualize_map_grid(json_path: Path):
     """Visualize map with grid overlay (best for analysis)"""
-    with open(json_path, 'r') as f:
-        map_data = json.load(f)
+    map_data = load_map(json_path)
+    parts = []
     
-    print("\n" + "=" * 100)
-    print(f"MAP: {map_data['map_name']} ({map_data['map_key']})")
-    print(f"Bounds: ({map_data['bounds']['min_x']}, {map_data['bounds']['min_y']}) to "
-          f"({map_data['bounds']['max_x']}, {map_data['bounds']['max_y']})")
-    print("=" * 100 + "\n")
+    parts.append("\n" + "=" * 100 + "\n")
+    parts.append(f"MAP: {map_data['map_name']} ({map_data['map_key']})\n")
+    parts.append(f"Bounds: ({map_data['bounds']['min_x']}, {map_data['bounds']['min_y']}) to "
+                 f"({map_data['bounds']['max_x']}, {map_data['bounds']['max_y']})\n")
+    parts.append("=" * 100 + "\n\n")
     
     tile_map = map_data['tile_map']
     traversal_map = map_data['traversal_map']
     
     if not tile_map or not traversal_map:
-        print("Map is empty!")
+        parts.append("Map is empty!\n")
+        write_output(parts)
         return
     
-    height = len(tile_map)
-    width = max(len(row) for row in tile_map) if height > 0 else 0
+    # Count once: the counters feed the statistics and give each map's distinct values
+    tile_counts = Counter(chain.from_iterable(tile_map))
+    trav_counts = Counter(chain.from_iterable(traversal_map))
     
-    print("COMBINED VIEW (Tile/Traversal)")
-    print("Format: [Tile Abbrev][Trav]")
-    print("=" * 100)
+    width = max(map(len, tile_map), default=0)
+    
+    parts.append("COMBINED VIEW (Tile/Traversal)\n")
+    parts.append("Format: [Tile Abbrev][Trav]\n")
+    parts.append("=" * 100 + "\n")
     
     # Header
-    print("      ", end="")
-    for x in range(width):
-        print(f"  {x:2d}  ", end="")
-    print()
-    print("     +" + "-----+" * width)
-    
-    # Combined view
-    for y in range(height):
-        print(f"{y:3d}  |", end="")
-        for x in range(width):
-            if x < len(tile_map[y]) and x < len(traversal_map[y]):
-                tile = tile_map[y][x]
-                trav = traversal_map[y][x]
-                tile_abbrev = abbreviate_tile(tile)
-                
-                # Color code based on traversal
-                if trav == 'W':
-                    print(f"\033[92m{tile_abbrev}{trav}\033[0m|", end="")  # Green
-                elif trav == 'N':
-                    print(f"\033[91m{tile_abbrev}{trav}\033[0m|", end="")  # Red
-                elif trav == 'P':
-                    print(f"\033[94m{tile_abbrev}{trav}\033[0m|", end="")  # Blue
-                elif trav == 'T':
-                    print(f"\033[93m{tile_abbrev}{trav}\033[0m|", end="")  # Yellow
-                else:
-                    print(f"{tile_abbrev}{trav}|", end="")
-            else:
-                print("    |", end="")
-        print()
-        print("     +" + "-----+" * width)
-    
-    print()
-    print_statistics(tile_map, traversal_map)
-
-
-def print_statistics(tile_map, traversal_map):
-    """Print tile and traversal statistics"""
-    # Tile statistics
-    tile_counts = {}
-    for row in tile_map:
-        for tile in row:
-            tile_counts[tile] = tile_counts.get(tile, 0) + 1
-    
-    # Traversal statistics
-    trav_counts = {}
-    for row in traversal_map:
-        for marker in row:
-            trav_counts[marker] = trav_counts.get(marker, 0) + 1
-    
-    print("=" * 100)
-    print("STATISTICS")
-    print("=" * 100)
+    col_header = "      " + "".join(f"  {x:2d}  " for x in range(width))
+    sep = separator("     +", "-----+", width)
+    parts.append(col_header + "\n" + sep + "\n")
+    
+    # Combined view, color coded only when writing to a terminal
+    abbrev_map = build_lut(tile_counts, abbreviate_tile)
+    grid_colored = GRID_COLORED if sys.stdout.isatty() else {}
+    # Rendered cell per distinct (tile, marker) pair, filled on first use
+    cell_lut = {}
+    for y, (tile_row, trav_row) in enumerate(zip(tile_map, traversal_map)):
+        parts.append(f"{y:3d}  |")
+        # zip stops at the shorter row; the remaining columns are blank cells
+        for cell_key in zip(tile_row, trav_row):
+            cell = cell_lut.get(cell_key)
+            if cell is None:
+                tile, trav = cell_key
+                # Color code based on traversal; the '|' separator stays uncolored
+                cell = cell_lut[cell_key] = grid_colored.get(trav, PLAIN).format(abbrev_map[tile] + trav) + "|"
+            parts.append(cell)
+        parts.append("    |" * (width - min(len(tile_row), len(trav_row))))
+        parts.append("\n" + sep + "\n")
+    
+    parts.append("\n")
+    parts.append(format_statistics(tile_counts, trav_counts))
+    write_output(parts)
+
+
+def format_statistics(tile_counts: Counter, trav_counts: Counter) -> str:
+    """Format tile and traversal statistics from precomputed counts"""
+    parts = []
+    parts.append("=" * 100 + "\n")
+    parts.append("STATISTICS\n")
+    parts.append("=" * 100 + "\n")
     
     # Split into columns
-    print("\nTOP 10 TILES:".ljust(50) + "TRAVERSAL STATUS:")
-    print("-" * 50 + "-" * 50)
+    parts.append("\nTOP 10 TILES:".ljust(50) + "TRAVERSAL STATUS:\n")
+    parts.append("-" * 50 + "-" * 50 + "\n")
     
     # Get top 10 tiles
-    top_tiles = sorted(tile_counts.items(), key=lambda x: -x[1])[:10]
+    top_tiles = tile_counts.most_common(10)
     
     # Traversal items
+    # Counter returns 0 for missing markers
     trav_items = [
-        ('?', 'Unknown', trav_counts.get('?', 0)),
-        ('W', 'Walkable', trav_counts.get('W', 0)),
-        ('N', 'Blocked', trav_counts.get('N', 0)),
-        ('P', 'Player', trav_counts.get('P', 0)),
-        ('T', 'Traversal', trav_counts.get('T', 0)),
-        ('I', 'Interactable', trav_counts.get('I', 0)),
+        ('?', 'Unknown', trav_counts['?']),
+        ('W', 'Walkable', trav_counts['W']),
+        ('N', 'Blocked', trav_counts['N']),
+        ('P', 'Player', trav_counts['P']),
+        ('T', 'Traversal', trav_counts['T']),
+        ('I', 'Interactable', trav_counts['I']),
     ]
     
     # Print side by side
@@ -341,24 +387,23 @@ def print_statistics(tile_map, traversal_map):
         else:
             trav_str = ""
         
-        print(tile_str + trav_str)
+        parts.append(tile_str + trav_str + "\n")
     
-    print("\n" + "=" * 100)
+    parts.append("\n" + "=" * 100 + "\n")
     
     # Summary
     total_tiles = sum(tile_counts.values())
-    explored_tiles = sum(count for marker, count in trav_counts.items() if marker != '?')
+    explored_tiles = sum(trav_counts.values()) - trav_counts['?']
     
-    print(f"\nTotal Tiles: {total_tiles}")
-    print(f"Explored: {explored_tiles} ({explored_tiles/total_tiles*100:.1f}%)")
-    print(f"Unique Tile Types: {len(tile_counts)}")
+    parts.append(f"\nTotal Tiles: {total_tiles}\n")
+    parts.append(f"Explored: {explored_tiles} ({explored_tiles/total_tiles*100:.1f}%)\n")
+    parts.append(f"Unique Tile Types: {len(tile_counts)}\n")
+    return "".join(parts)
 
 
 def print_legend():
     """Print legend of tile abbreviations"""
-    print("\n" + "=" * 100)
-    print("TILE ABBREVIATION LEGEND")
-    print("=" * 100)
+    lines = ["\n" + "=" * 100, "TILE ABBREVIATION LEGEND", "=" * 100]
     
     # Group abbreviations by category
     categories = {
@@ -370,44 +415,41 @@ def print_legend():
     }
     
     for category, tiles in categories.items():
-        print(f"\n{category}:")
-        for tile in tiles:
-            if tile in TILE_ABBREV:
-                print(f"  {TILE_ABBREV[tile]} = {tile}")
+        lines.append(f"\n{category}:")
+        lines.extend(f"  {TILE_ABBREV[tile]} = {tile}" for tile in tiles if tile in TILE_ABBREV)
     
-    print("\n" + "=" * 100)
+    lines.append("\n" + "=" * 100)
+    write_output(["\n".join(lines), "\n"])
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python visualize_map.py <path_to_map.json> [--compact|--full|--grid|--legend]")
-        print("\nOptions:")
-        print("  --compact (default): 3-letter tile codes, easy to read")
-        print("  --full: Full tile names (may wrap)")
-        print("  --grid: Combined tile+traversal view with grid")
-        print("  --legend: Show tile abbreviation legend")
-        sys.exit(1)
-    
-    json_path = Path(sys.argv[1])
-    if not json_path.exists():
-        print(f"File not found: {json_path}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Converts JSON maps to visual representation")
+    parser.add_argument("json_path", type=Path, help="path to the map JSON file")
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument("--compact", dest="mode", action="store_const", const="compact",
+                            help="3-letter tile codes, easy to read (default)")
+    mode_group.add_argument("--full", dest="mode", action="store_const", const="full",
+                            help="Full tile names (may wrap)")
+    mode_group.add_argument("--grid", dest="mode", action="store_const", const="grid",
+                            help="Combined tile+traversal view with grid")
+    mode_group.add_argument("--legend", dest="mode", action="store_const", const="legend",
+                            help="Show tile abbreviation legend")
+    parser.set_defaults(mode="compact")
+    args = parser.parse_args()
+
+    if not args.json_path.exists():
+        print(f"File not found: {args.json_path}")
         sys.exit(1)
-    
-    # Determine mode
-    mode = "compact"  # Default
-    if len(sys.argv) > 2:
-        if sys.argv[2] == "--full":
-            mode = "full"
-        elif sys.argv[2] == "--grid":
-            mode = "grid"
-        elif sys.argv[2] == "--legend":
-            print_legend()
-            sys.exit(0)
-    
-    # Visualize
-    if mode == "compact":
-        visualize_map_compact(json_path)
-    elif mode == "full":
-        visualize_map_full(json_path)
-    elif mode == "grid":
-        visualize_map_grid(json_path)
+
+    if args.mode == "legend":
+        print_legend()
+        sys.exit(0)
+
+    visualizers = {
+        "compact": visualize_map_compact,
+        "full": visualize_map_full,
+        "grid": visualize_map_grid,
+    }
+    visualizers[args.mode](args.json_path)